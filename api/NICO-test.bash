@@ -6,7 +6,7 @@ if ! [ -x "$(command -v pytest)" ]; then
   pip install pytest
 fi
 
-for MODULE in nicoaudio nicoface nicomotion
+for MODULE in nicoaudio nicoemotionrecognition nicoface nicomotion nicovision
 do
   echo Testing $MODULE
   pytest -v src/$MODULE/tests
@@ -58,6 +58,12 @@ parser.add_argument(
     "--disable-gui", dest="gui", action="store_false", help="Disables the GUI."
 )
 
+parser.add_argument(
+    "--quantize",
+    action="store_true",
+    help="Use a version of the emotion model with weights quantized to 8 bit.",
+)
+
 args = parser.parse_args()
 
 robot = None
@@ -76,7 +82,12 @@ if "See3CAM" in camera_path:
     camera.zoom(300)
 
 emotionRecogniton = EmotionRecognition.EmotionRecognition(
-    device=camera, robot=robot, face=face, voiceEnabled=args.voice, german=args.german
+    device=camera,
+    robot=robot,
+    face=face,
+    voiceEnabled=args.voice,
+    german=args.german,
+    quantize=args.quantize,
 )
 
 emotionRecogniton.start(showGUI=args.gui, faceTracking=args.motion, mirrorEmotion=True)
@@ -96,6 +96,7 @@ class EmotionRecognition:
         faceDetectionDelta=10,
         voiceEnabled=False,
         german=False,
+        quantize=False,
     ):
         """
         Initialises the EmotionRecognition
@@ -113,6 +114,10 @@ class EmotionRecognition:
         :type voiceEnabled: bool
         :param german: switch audio from english to german
         :type german: bool
+        :param quantize: use a version of the model with weights quantized to
+                         8 bit (falls back to the original model if it can not
+                         be converted)
+        :type quantize: bool
         """
         self._logger = logging.getLogger(__name__)
         self._finalImageSize = (
@@ -140,7 +145,7 @@ class EmotionRecognition:
         self._german = german
 
         self._modelCategorical = modelLoader.modelLoader(
-            modelDictionary.CategoricaModel
+            modelDictionary.CategoricaModel, quantize=quantize
         )
         # self._modelDimensional = modelLoader.modelLoader(
         #     modelDictionary.DimensionalModel
@@ -15,22 +15,33 @@ class imageProcessingUtil:
 
         self._faceDetector = dlib.get_frontal_face_detector()
         self.faceDetectionMaximumFrequency = faceDetectionMaximumFrequency
+        self._preProcessBuffer = None
 
     def preProcess(self, image, imageSize):
-
-        image = numpy.array(image)
-
+        """
+        Converts a BGR face image to a normalized grayscale network input.
+
+        The result is written to a buffer that is reused by the next call, so
+        it has to be consumed (e.g. classified) before preprocessing another
+        image.
+
+        :param image: BGR face image
+        :type image: numpy.ndarray
+        :param imageSize: (width, height) of the network input
+        :type imageSize: tuple
+        :return: float32 image with shape (1, height, width)
+        :rtype: numpy.ndarray
+        """
         image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
-        image = numpy.array(cv2.resize(image, imageSize))
-
-        image = numpy.expand_dims(image, axis=0)
-
-        image = image.astype("float32")
+        image = cv2.resize(image, imageSize)
 
-        image /= 255
+        shape = (1, imageSize[1], imageSize[0])
+        if self._preProcessBuffer is None or self._preProcessBuffer.shape != shape:
+            self._preProcessBuffer = numpy.empty(shape, dtype=numpy.float32)
+        numpy.divide(image, numpy.float32(255), out=self._preProcessBuffer[0])
 
-        return image
+        return self._preProcessBuffer
 
     previouslyDetectedface = None
     currentFaceDetectionFrequency = -1
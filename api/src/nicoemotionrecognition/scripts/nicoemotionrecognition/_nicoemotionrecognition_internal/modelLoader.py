@@ -1,6 +1,12 @@
+import logging
 import numpy
 import os
+import subprocess
+import sys
+import tempfile
 
+import tensorflow as tf
+from keras import backend as K
 from keras.models import load_model
 
 from nicoemotionrecognition._nicoemotionrecognition_internal import (
@@ -11,13 +17,64 @@ from nicoemotionrecognition._nicoemotionrecognition_internal import (
 
 # os.environ["CUDA_VISIBLE_DEVICES"] = "0"
 
-# from keras import backend as K
+CUSTOM_OBJECTS = {
+    "fbeta_score": metrics.fbeta_score,
+    "recall": metrics.recall,
+    "precision": metrics.precision,
+    "ccc": metrics.ccc,
+}
+
+# keep TensorFlow from spreading each operation across all cores while
+# OpenCV decodes and writes frames in parallel
+INTRA_OP_THREADS = 1
+
+_session = None
+# loaded Keras models and their inference functions by model file, shared by
+# all modelLoader instances of the process
+_loadedModels = {}
+
+
+def configureSession():
+    """
+    Sets up the Keras session once per process. GPU memory is allocated on
+    demand so several recognizer processes can share one GPU, operations
+    fall back to the CPU if the requested device is not available and each
+    operation uses at most INTRA_OP_THREADS threads.
+    """
+    global _session
+    if _session is None:
+        config = tf.ConfigProto(
+            allow_soft_placement=True, intra_op_parallelism_threads=INTRA_OP_THREADS
+        )
+        config.gpu_options.allow_growth = True
+        _session = tf.Session(config=config)
+        K.set_session(_session)
+
+
+def convertQuantized(modelPath, outputPath):
+    """
+    Converts a Keras model file into a TensorFlow Lite model with weights
+    quantized to 8 bit. The converter resets the default graph, so this is
+    meant to run in its own process (python -m <this module> modelPath
+    outputPath) rather than in a process that already loaded Keras models.
+
+    :param modelPath: path of the Keras model file
+    :type modelPath: str
+    :param outputPath: path the TensorFlow Lite model is written to
+    :type outputPath: str
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model_file(
+        modelPath, custom_objects=CUSTOM_OBJECTS
+    )
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    content = converter.convert()
+    with open(outputPath, "wb") as outputFile:
+        outputFile.write(content)
 
 
 class modelLoader:
 
     IMAGE_SIZE = (64, 64)
-    BATCH_SIZE = 32
 
     GPU = "/gpu:0"  #'/cpu:0'
 
@@ -33,28 +90,147 @@ class modelLoader:
     def dataLoader(self):
         return self._dataLoader
 
-    def __init__(self, modelDictionary):
+    def __init__(self, modelDictionary, quantize=False):
 
+        self._logger = logging.getLogger(__name__)
         self._modelDictionary = modelDictionary
+        self._quantize = quantize
         self._dataLoader = imageProcessingUtil.imageProcessingUtil()
 
         self.loadModel()
 
     def loadModel(self):
 
-        self._model = load_model(
-            self.modelDictionary.modelDirectory,
-            custom_objects={
-                "fbeta_score": metrics.fbeta_score,
-                "recall": metrics.recall,
-                "precision": metrics.precision,
-                "ccc": metrics.ccc,
-            },
-        )
-        self._model.summary()
+        self._interpreter = None
+        if self._quantize:
+            self._interpreter = self._loadQuantizedModel()
+
+        if self._interpreter is None:
+            modelDirectory = self.modelDictionary.modelDirectory
+            if modelDirectory not in _loadedModels:
+                configureSession()
+                # placement is fixed when the graph is built, so both the model
+                # and the inference function are created on the configured device
+                with tf.device(self.GPU):
+                    model = load_model(modelDirectory, custom_objects=CUSTOM_OBJECTS)
+                    # build the inference graph once instead of going through
+                    # the Keras predict machinery on every call; the learning
+                    # phase is fed as 0 so dropout and batch normalization run
+                    # in test mode
+                    inferenceFunction = K.function(
+                        model.inputs + [K.learning_phase()], model.outputs
+                    )
+                if self._logger.isEnabledFor(logging.DEBUG):
+                    model.summary(print_fn=self._logger.debug)
+                _loadedModels[modelDirectory] = (model, inferenceFunction)
+            self._model, self._inferenceFunction = _loadedModels[modelDirectory]
+            inputShape = tuple(self._model.input_shape[1:])
+        else:
+            self._model = None
+            inputDetails = self._interpreter.get_input_details()[0]
+            self._inputIndex = inputDetails["index"]
+            self._outputIndex = self._interpreter.get_output_details()[0]["index"]
+            inputShape = tuple(inputDetails["shape"][1:])
+
+        # input buffer reused by classify, so frames are copied into memory
+        # that is already in the dtype the network expects
+        self._input = numpy.empty((1,) + inputShape, dtype=numpy.float32)
+
+    def _loadQuantizedModel(self):
+        """
+        Loads a TensorFlow Lite version of the model with weights quantized to
+        8 bit. The converted model is cached next to the original model file
+        and converted again if the original model file is newer than the cache
+        or the cache can not be loaded.
+
+        :return: Interpreter for the quantized model (or None if the model
+                 could not be converted)
+        :rtype: tf.lite.Interpreter
+        """
+        modelPath = self.modelDictionary.modelDirectory
+        cachePath = os.path.splitext(modelPath)[0] + "-quantized.tflite"
+        if os.path.isfile(cachePath) and (
+            os.path.getmtime(cachePath) >= os.path.getmtime(modelPath)
+        ):
+            interpreter = self._createInterpreter(cachePath)
+            if interpreter is not None:
+                return interpreter
+            self._logger.warning(
+                "Unable to load cached quantized model %s - converting again",
+                cachePath,
+            )
+        # the model is converted into a temporary file next to the cache, which
+        # then replaces the cache, so an interrupted conversion never leaves a
+        # truncated cache behind
+        try:
+            handle, convertedPath = tempfile.mkstemp(
+                suffix=".tflite", dir=os.path.dirname(cachePath)
+            )
+        except (IOError, OSError):
+            self._logger.warning("Unable to cache quantized model at %s", cachePath)
+            handle, convertedPath = tempfile.mkstemp(suffix=".tflite")
+            cachePath = None
+        os.close(handle)
+        interpreter = None
+        try:
+            # the converter clears the Keras session and resets the default
+            # graph, which would detach the shared session from models loaded
+            # afterwards, so it runs in a separate process
+            subprocess.check_call(
+                [sys.executable, "-m", __name__, modelPath, convertedPath]
+            )
+            interpreter = self._createInterpreter(convertedPath)
+            if interpreter is not None and cachePath is not None:
+                os.rename(convertedPath, cachePath)
+        except (subprocess.CalledProcessError, IOError, OSError) as e:
+            self._logger.warning(
+                "Unable to convert %s: %s", self.modelDictionary.modelname, e
+            )
+        finally:
+            if os.path.isfile(convertedPath):
+                os.remove(convertedPath)
+        if interpreter is None:
+            self._logger.warning(
+                "Unable to quantize %s - using unquantized model instead",
+                self.modelDictionary.modelname,
+            )
+        return interpreter
+
+    def _createInterpreter(self, path):
+        """
+        Creates an interpreter for a TensorFlow Lite model file
+
+        :param path: path of the TensorFlow Lite model
+        :type path: str
+        :return: Interpreter for the model (or None if the model could not be
+                 loaded)
+        :rtype: tf.lite.Interpreter
+        """
+        try:
+            with open(path, "rb") as modelFile:
+                interpreter = tf.lite.Interpreter(model_content=modelFile.read())
+            interpreter.allocate_tensors()
+        except Exception as e:
+            self._logger.debug("Unable to load %s: %s", path, e)
+            return None
+        return interpreter
 
     def classify(self, image):
-
-        return self.model.predict(
-            numpy.array([image]), batch_size=self.BATCH_SIZE, verbose=0
-        )
+        """
+        Classifies a single preprocessed image
+
+        :param image: preprocessed image
+        :type image: numpy.ndarray
+        :return: predictions with shape (1, number of classes)
+        :rtype: numpy.ndarray
+        """
+        self._input[0] = image
+        if self._interpreter is None:
+            return self._inferenceFunction([self._input, 0])[0]
+        self._interpreter.set_tensor(self._inputIndex, self._input)
+        self._interpreter.invoke()
+        return self._interpreter.get_tensor(self._outputIndex)
+
+
+if __name__ == "__main__":
+    convertQuantized(sys.argv[1], sys.argv[2])
@@ -0,0 +1,118 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from nicoemotionrecognition._nicoemotionrecognition_internal import modelLoader
+
+
+class ModelLoaderQuantizationTest(unittest.TestCase):
+    def setUp(self):
+        # fake model file in a temporary directory, so the quantized model
+        # cache is written next to it
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.modelPath = os.path.join(self.directory, "model.h5")
+        open(self.modelPath, "wb").close()
+        self.cachePath = os.path.join(self.directory, "model-quantized.tflite")
+        self.modelDictionary = mock.Mock(
+            modelDirectory=self.modelPath, modelname="test model"
+        )
+        # avoid creating a real session and loading a real network
+        self.model = mock.Mock(inputs=[], outputs=[], input_shape=(None, 1, 64, 64))
+        for target, kwargs in (
+            ("configureSession", {}),
+            ("load_model", {"return_value": self.model}),
+            ("K", {}),
+            ("imageProcessingUtil", {}),
+            ("_loadedModels", {"new": {}}),
+        ):
+            mock.patch.object(modelLoader, target, **kwargs).start()
+        self.interpreter = mock.patch.object(modelLoader.tf.lite, "Interpreter").start()
+        self.interpreter.return_value.get_input_details.return_value = [
+            {"shape": (1, 1, 64, 64), "index": 0}
+        ]
+        self.addCleanup(mock.patch.stopall)
+
+    def _patchConversion(self, content=None):
+        """Replaces the conversion process by writing content to its output"""
+
+        def convert(command):
+            if content is None:
+                raise subprocess.CalledProcessError(1, command)
+            with open(command[-1], "wb") as convertedFile:
+                convertedFile.write(content)
+
+        return mock.patch.object(
+            modelLoader.subprocess, "check_call", side_effect=convert
+        )
+
+    def _writeCache(self, content):
+        with open(self.cachePath, "wb") as cacheFile:
+            cacheFile.write(content)
+
+    def _readCache(self):
+        with open(self.cachePath, "rb") as cacheFile:
+            return cacheFile.read()
+
+    def test_fallback_when_conversion_fails(self):
+        """Checks that the Keras model is used if quantization fails"""
+        with self._patchConversion():
+            loader = modelLoader.modelLoader(self.modelDictionary, quantize=True)
+        self.assertIs(loader.model, self.model)
+        self.assertIsNone(loader._interpreter)
+        self.assertEqual(os.listdir(self.directory), ["model.h5"])
+
+    def test_conversion_runs_in_separate_process(self):
+        """Checks that converting does not reset the graph of this process"""
+        with self._patchConversion(b"converted") as conversion:
+            modelLoader.modelLoader(self.modelDictionary, quantize=True)
+        command = conversion.call_args[0][0]
+        self.assertEqual(command[:3], [sys.executable, "-m", modelLoader.__name__])
+        self.assertEqual(command[3], self.modelPath)
+
+    def test_current_cache_is_reused(self):
+        """Checks that a cache newer than the model file skips conversion"""
+        self._writeCache(b"cached")
+        os.utime(self.modelPath, (0, 0))
+        with self._patchConversion() as conversion:
+            loader = modelLoader.modelLoader(self.modelDictionary, quantize=True)
+        conversion.assert_not_called()
+        self.interpreter.assert_called_once_with(model_content=b"cached")
+        self.assertIsNone(loader.model)
+
+    def test_stale_cache_is_converted_again(self):
+        """Checks that a cache older than the model file is replaced"""
+        self._writeCache(b"stale")
+        os.utime(self.cachePath, (0, 0))
+        with self._patchConversion(b"converted") as conversion:
+            modelLoader.modelLoader(self.modelDictionary, quantize=True)
+        conversion.assert_called_once()
+        self.interpreter.assert_called_once_with(model_content=b"converted")
+        self.assertEqual(self._readCache(), b"converted")
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    def test_corrupt_cache_is_converted_again(self):
+        """Checks that a current cache which can not be loaded is replaced"""
+        self._writeCache(b"corrupt")
+        os.utime(self.modelPath, (0, 0))
+        interpreter = self.interpreter.return_value
+
+        def createInterpreter(model_content):
+            if model_content == b"corrupt":
+                raise ValueError("Model provided has model identifier ''")
+            return interpreter
+
+        self.interpreter.side_effect = createInterpreter
+        with self._patchConversion(b"converted") as conversion:
+            loader = modelLoader.modelLoader(self.modelDictionary, quantize=True)
+        conversion.assert_called_once()
+        self.assertIs(loader._interpreter, interpreter)
+        self.assertEqual(self._readCache(), b"converted")
+
+
+if __name__ == "__main__":
+    unittest.main()
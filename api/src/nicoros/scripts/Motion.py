@@ -19,13 +19,29 @@ except ImportError:
     pass
 
 
-class NicoRosMotion:
+class NicoRosMotion(object):
     """
     The NicoRosMotion class exposes the functions of :class:`nicomotion.Motion`
     to ROS and
     periodically publishes the current joint states
     """
 
+    # attributes are read by every ROS callback, slots avoid the instance dict
+    __slots__ = (
+        "logger",
+        "robot",
+        "config",
+        "jsonConfig",
+        "vrep",
+        "fakeJointStates",
+        "_running",
+        "_palm_publisher_left",
+        "_palm_publisher_right",
+        "_palm_thread",
+        "_jointStatePublisher",
+        "_jointStateThread",
+    )
+
     @staticmethod
     def getConfig():
         """
@@ -47,53 +63,60 @@ class NicoRosMotion:
             "headless": False,
         }
 
-    def __init__(self, config=None):
+    def __init__(self, config=None, robot=None):
         """
         RosNicoMotion provides :class:`nicomotion.Motion` functions over ROS
         and periodically publishes the current joint states
 
+        Code running in the same process should pass its own
+        :class:`nicomotion.Motion` as robot and call its methods directly,
+        which avoids serializing every command through the ROS topics.
+
         :param config: Configuration of the :class:`nicomotion.Motion` and
                        RosNicoMotion interface
         :type config: dict
+        :param robot: Existing Motion object to expose instead of creating a
+                      new one from config
+        :type robot: nicomotion.Motion
         """
         self.logger = logging.getLogger(__name__)
         self.robot = None
         if config is None:
             config = NicoRosMotion.getConfig()
 
-        if rospy.has_param(config["rostopicName"] + "/robotMotorFile"):
-            config["robotMotorFile"] = rospy.get_param(
-                config["rostopicName"] + "/robotMotorFile"
-            )
-        if rospy.has_param(config["rostopicName"] + "/vrep"):
-            config["vrep"] = rospy.get_param(config["rostopicName"] + "/vrep")
-        if rospy.has_param(config["rostopicName"] + "/vrepScene"):
-            config["vrepScene"] = rospy.get_param(config["rostopicName"] + "/vrepScene")
-        if rospy.has_param(config["rostopicName"] + "/fakeExecution"):
-            config["fakeExecution"] = rospy.get_param(
-                config["rostopicName"] + "/fakeExecution"
-            )
-        if rospy.has_param(config["rostopicName"] + "/pyrep"):
-            config["pyrep"] = rospy.get_param(config["rostopicName"] + "/pyrep")
-        if rospy.has_param(config["rostopicName"] + "/headless"):
-            config["headless"] = rospy.get_param(config["rostopicName"] + "/headless")
+        prefix = config["rostopicName"]
+        if rospy.has_param(prefix + "/robotMotorFile"):
+            config["robotMotorFile"] = rospy.get_param(prefix + "/robotMotorFile")
+        if rospy.has_param(prefix + "/vrep"):
+            config["vrep"] = rospy.get_param(prefix + "/vrep")
+        if rospy.has_param(prefix + "/vrepScene"):
+            config["vrepScene"] = rospy.get_param(prefix + "/vrepScene")
+        if rospy.has_param(prefix + "/fakeExecution"):
+            config["fakeExecution"] = rospy.get_param(prefix + "/fakeExecution")
+        if rospy.has_param(prefix + "/pyrep"):
+            config["pyrep"] = rospy.get_param(prefix + "/pyrep")
+        if rospy.has_param(prefix + "/headless"):
+            config["headless"] = rospy.get_param(prefix + "/headless")
 
         # init Motion
         self.logger.info("-- Init NicoRosMotion --")
-        if config["pyrep"]:
-            vrepConfig = Motion.pyrepConfig()
-            vrepConfig["vrep_scene"] = config["vrepScene"]
-            vrepConfig["headless"] = config["headless"]
+        if robot is not None:
+            self.robot = robot
         else:
-            vrepConfig = Motion.vrepRemoteConfig()
-            vrepConfig["vrep_scene"] = config["vrepScene"]
-            vrepConfig["vrep_host"] = config["vrepHost"]
-            vrepConfig["vrep_port"] = config["vrepPort"]
-        self.robot = Motion(
-            motorConfig=config["robotMotorFile"],
-            vrep=config["vrep"],
-            vrepConfig=vrepConfig,
-        )
+            if config["pyrep"]:
+                vrepConfig = Motion.pyrepConfig()
+                vrepConfig["vrep_scene"] = config["vrepScene"]
+                vrepConfig["headless"] = config["headless"]
+            else:
+                vrepConfig = Motion.vrepRemoteConfig()
+                vrepConfig["vrep_scene"] = config["vrepScene"]
+                vrepConfig["vrep_host"] = config["vrepHost"]
+                vrepConfig["vrep_port"] = config["vrepPort"]
+            self.robot = Motion(
+                motorConfig=config["robotMotorFile"],
+                vrep=config["vrep"],
+                vrepConfig=vrepConfig,
+            )
 
         # init ROS
         self.logger.debug("Init ROS")
@@ -101,79 +124,76 @@ class NicoRosMotion:
 
         # setup subscriber
         self.logger.debug("Init subscriber")
-        rospy.Subscriber(
-            "%s/openHand" % config["rostopicName"], nicomsg.msg.s, self._ROSPY_openHand
-        )
-        rospy.Subscriber(
-            "%s/closeHand" % config["rostopicName"],
+        self._subscribe(prefix + "/openHand", nicomsg.msg.s, self._ROSPY_openHand)
+        self._subscribe(
+            prefix + "/closeHand",
             nicomsg.msg.s,
             self._ROSPY_closeHand,
         )
-        rospy.Subscriber(
-            "%s/enableForceControlAll" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/enableForceControlAll",
             nicomsg.msg.i,
             self._ROSPY_enableForceControlAll,
         )
-        rospy.Subscriber(
-            "%s/disableForceControlAll" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/disableForceControlAll",
             nicomsg.msg.empty,
             self._ROSPY_disableForceControlAll,
         )
-        rospy.Subscriber(
-            "%s/enableForceControl" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/enableForceControl",
             nicomsg.msg.si,
             self._ROSPY_enableForceControl,
         )
-        rospy.Subscriber(
-            "%s/disableForceControl" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/disableForceControl",
             nicomsg.msg.s,
             self._ROSPY_disableForceControl,
         )
-        rospy.Subscriber(
-            "%s/setAngle" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/setAngle",
             nicomsg.msg.sff,
             self._ROSPY_setAngle,
         )
-        rospy.Subscriber(
-            "%s/changeAngle" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/changeAngle",
             nicomsg.msg.sff,
             self._ROSPY_changeAngle,
         )
-        rospy.Subscriber(
-            "%s/setMaximumSpeed" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/setMaximumSpeed",
             nicomsg.msg.f,
             self._ROSPY_setMaximumSpeed,
+            queue_size=1,
         )
-        rospy.Subscriber(
-            "%s/setStiffness" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/setStiffness",
             nicomsg.msg.sf,
             self._ROSPY_setStiffness,
         )
-        rospy.Subscriber(
-            "%s/setPID" % config["rostopicName"], nicomsg.msg.sfff, self._ROSPY_setPID
-        )
-        rospy.Subscriber(
-            "%s/enableTorque" % config["rostopicName"],
+        self._subscribe(prefix + "/setPID", nicomsg.msg.sfff, self._ROSPY_setPID)
+        self._subscribe(
+            prefix + "/enableTorque",
             nicomsg.msg.s,
             self._ROSPY__enableTorque,
         )
-        rospy.Subscriber(
-            "%s/disableTorque" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/disableTorque",
             nicomsg.msg.s,
             self._ROSPY__disableTorque,
         )
-        rospy.Subscriber(
-            "%s/enableTorqueAll" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/enableTorqueAll",
             nicomsg.msg.empty,
             self._ROSPY__enableTorqueAll,
         )
-        rospy.Subscriber(
-            "%s/disableTorqueAll" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/disableTorqueAll",
             nicomsg.msg.empty,
             self._ROSPY__disableTorqueAll,
         )
-        rospy.Subscriber(
-            "%s/toSafePosition" % config["rostopicName"],
+        self._subscribe(
+            prefix + "/toSafePosition",
             nicomsg.msg.empty,
             self._ROSPY__toSafePosition,
         )
@@ -181,76 +201,74 @@ class NicoRosMotion:
         # setup services
         self.logger.debug("Init services")
         rospy.Service(
-            "%s/getConfig" % config["rostopicName"],
+            prefix + "/getConfig",
             nicomsg.srv.GetString,
             self._ROSPY_getConfig,
         )
         rospy.Service(
-            "%s/getVrep" % config["rostopicName"],
+            prefix + "/getVrep",
             nicomsg.srv.GetString,
             self._ROSPY_getVrep,
         )
         rospy.Service(
-            "%s/getAngle" % config["rostopicName"],
+            prefix + "/getAngle",
             nicomsg.srv.GetValue,
             self._ROSPY_getAngle,
         )
         rospy.Service(
-            "%s/getPose" % config["rostopicName"],
+            prefix + "/getPose",
             nicomsg.srv.GetValues,
             self._ROSPY_getPose,
         )
         rospy.Service(
-            "%s/getJointNames" % config["rostopicName"],
+            prefix + "/getJointNames",
             nicomsg.srv.GetNames,
             self._ROSPY_getJointNames,
         )
         rospy.Service(
-            "%s/getAngleUpperLimit" % config["rostopicName"],
+            prefix + "/getAngleUpperLimit",
             nicomsg.srv.GetValue,
             self._ROSPY_getAngleUpperLimit,
         )
         rospy.Service(
-            "%s/getAngleLowerLimit" % config["rostopicName"],
+            prefix + "/getAngleLowerLimit",
             nicomsg.srv.GetValue,
             self._ROSPY_getAngleLowerLimit,
         )
         rospy.Service(
-            "%s/getTorqueLimit" % config["rostopicName"],
+            prefix + "/getTorqueLimit",
             nicomsg.srv.GetValue,
             self._ROSPY_getTorqueLimit,
         )
         rospy.Service(
-            "%s/getTemperature" % config["rostopicName"],
+            prefix + "/getTemperature",
             nicomsg.srv.GetValue,
             self._ROSPY_getTemperature,
         )
         rospy.Service(
-            "%s/getCurrent" % config["rostopicName"],
+            prefix + "/getCurrent",
             nicomsg.srv.GetValue,
             self._ROSPY_getCurrent,
         )
         rospy.Service(
-            "%s/getStiffness" % config["rostopicName"],
+            prefix + "/getStiffness",
             nicomsg.srv.GetValue,
             self._ROSPY_getStiffness,
         )
-        rospy.Service(
-            "%s/getPID" % config["rostopicName"], nicomsg.srv.GetPID, self._ROSPY_getPID
-        )
+        rospy.Service(prefix + "/getPID", nicomsg.srv.GetPID, self._ROSPY_getPID)
 
         rospy.Service(
-            "%s/nextSimulationStep" % config["rostopicName"],
+            prefix + "/nextSimulationStep",
             Empty,
             self._ROSPY__nextSimulationStep,
         )
         rospy.Service(
-            "%s/startSimulation" % config["rostopicName"],
+            prefix + "/startSimulation",
             Empty,
             self._ROSPY__startSimulation,
         )
         rospy.Service(
-            "%s/stopSimulation" % config["rostopicName"],
+            prefix + "/stopSimulation",
             Empty,
             self._ROSPY__stopSimulation,
         )
@@ -265,12 +283,12 @@ class NicoRosMotion:
         # setup publishers
         self.logger.debug("Init publishers")
         self._palm_publisher_left = rospy.Publisher(
-            "%s/palm_sensor/left" % config["rostopicName"],
+            prefix + "/palm_sensor/left",
             nicomsg.msg.i,
             queue_size=10,
         )
         self._palm_publisher_right = rospy.Publisher(
-            "%s/palm_sensor/right" % config["rostopicName"],
+            prefix + "/palm_sensor/right",
             nicomsg.msg.i,
             queue_size=10,
         )
@@ -298,6 +316,29 @@ class NicoRosMotion:
             self._jointStateThread.join()
         self._palm_thread.join()
 
+    def _subscribe(self, topic, message_type, callback, queue_size=None):
+        """
+        Subscribes a command callback to a topic. TCP_NODELAY is requested so
+        small command messages are not delayed by Nagle's algorithm. The
+        receive queue is unbounded by default, since most topics carry
+        commands for individual joints or hands that must not be dropped.
+
+        :param topic: ROS topic name
+        :type topic: str
+        :param message_type: ROS message class
+        :param callback: Callback handle
+        :type callback: function
+        :param queue_size: Number of messages to buffer before the oldest are
+                           dropped (None = unbounded), only suitable for topics
+                           where just the latest value matters
+        :type queue_size: int
+        :return: ROS subscriber
+        :rtype: rospy.Subscriber
+        """
+        return rospy.Subscriber(
+            topic, message_type, callback, queue_size=queue_size, tcp_nodelay=True
+        )
+
     def _ROSPY_openHand(self, message):
         """
         Callback handle for :meth:`nicomotion.Motion.openHand`
@@ -612,11 +653,10 @@ class NicoRosMotion:
         """
         Loop for sending the current joint state
         """
+        fakeExecutionParam = self.config["rostopicName"] + "/fakeExecution"
         while self._running:
-            if rospy.has_param(self.config["rostopicName"] + "/fakeExecution"):
-                self.config["fakeExecution"] = rospy.get_param(
-                    self.config["rostopicName"] + "/fakeExecution"
-                )
+            if rospy.has_param(fakeExecutionParam):
+                self.config["fakeExecution"] = rospy.get_param(fakeExecutionParam)
             message = sensor_msgs.msg.JointState()
             message.name = []
             message.position = []
@@ -822,6 +862,10 @@ if __name__ == "__main__":
 
     rosConnection = NicoRosMotion(config)
 
+    # rospy invokes the callbacks of each subscription and service on the
+    # receiving thread of its connection, so commands on different topics
+    # already run concurrently while commands on the same topic keep their
+    # order. spin only keeps the main thread alive until shutdown.
     rospy.spin()
 
     rosConnection.stop()
@@ -1,6 +1,6 @@
-import datetime
 import logging
 import os
+import threading
 import time
 
 import cv2
@@ -19,6 +19,20 @@ def get_devices():
     return VideoDevice.get_all_devices()
 
 
+def _isoformat(timestamp):
+    """
+    Formats a unix timestamp as local ISO 8601 time with microseconds without
+    creating a datetime object
+
+    :param timestamp: Seconds since the epoch
+    :type timestamp: float
+    :return: ISO 8601 formatted time
+    :rtype: str
+    """
+    return (time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(timestamp)) +
+            '.%06d' % int((timestamp % 1) * 1e6))
+
+
 class ImageRecorder:
     """
     The ImageRecorder class enables the capturing of images from a camera.
@@ -27,7 +41,8 @@ class ImageRecorder:
     def __init__(self, device='', width=640, height=480, framerate=20,
                  zoom=None, pan=None, tilt=None, settings_file=None,
                  setting="standard", writer_threads=2, compressed=True,
-                 pixel_format="MJPG", calibration_file=None):
+                 pixel_format="MJPG", calibration_file=None,
+                 queue_size=None, jpeg_quality=90):
         """
         Initialises the ImageRecorder with a given device.
 
@@ -55,9 +70,19 @@ class ImageRecorder:
         :type setting: str
         :param writer_threads: Number of worker threads for image writer
         :type writer_threads: int
+        :param queue_size: Maximum number of images waiting to be written - the
+                           oldest image is dropped once the queue is full
+                           (unbounded if None)
+        :type queue_size: int
+        :param jpeg_quality: Quality of images stored as JPEG (0 to 100)
+        :type jpeg_quality: int
         :param pixel_format: fourcc codec
         :type pixel_format: string
         """
+        # match OpenCV's worker pool to the writer threads, so encoding frames
+        # in parallel does not oversubscribe the cores
+        cv2.setUseOptimized(True)
+        cv2.setNumThreads(max(1, writer_threads))
         self._device = VideoDevice.from_device(device, framerate, width,
                                                height, zoom, pan, tilt,
                                                settings_file, setting,
@@ -66,8 +91,17 @@ class ImageRecorder:
         if self._device is None:
             logging.error('Can not create device from path' +
                           str(self._device))
-        self._target = 'picture-{}.png'
-        self._image_writer = ImageWriter(writer_threads)
+        # frames from a compressed stream are already lossy, so they are stored
+        # as JPEG which encodes much faster than PNG
+        self._extension = '.jpg' if pixel_format == 'MJPG' else '.png'
+        self._set_target('picture-{}' + self._extension)
+        self._image_writer = ImageWriter(writer_threads,
+                                         jpeg_quality=jpeg_quality,
+                                         queue_size=queue_size)
+        # only applied to .jpg targets, ignored by other formats
+        self._write_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self._first_frame = threading.Event()
+        self._captured_frame = None
 
     def load_settings(self, file_path, setting="standard"):
         """
@@ -100,7 +134,9 @@ class ImageRecorder:
 
     def enable_write(self, state=True):
         """
-        Sets the writing to disk state
+        Sets the writing to disk state. While writing is disabled, captured
+        frames are kept in memory and written once writing is enabled again or
+        the writer is closed.
 
         :param state: Write enabled
         :type value: bool
@@ -132,7 +168,7 @@ class ImageRecorder:
         :return: Path (or '' if an error occured
         :rtype: str
         """
-        path = 'picture-' + datetime.datetime.today().isoformat() + '.png'
+        path = 'picture-' + _isoformat(time.time()) + self._extension
         return os.path.abspath(path) if self.save_image_to(path) else ''
 
     def save_image_to(self, path):
@@ -143,20 +179,38 @@ class ImageRecorder:
         :return: True if successful
         :rtype: bool
         """
-        self._target = path
+        self._set_target(path)
         if self._device is None:
             logging.error('Capture device not initialized')
             return False
         if not self._device._open:
             self._device.open()
-        self._device.add_callback(self._callback)
-        time.sleep(.1)
+        self._captured_frame = None
+        self._first_frame.clear()
+        self._device.add_callback(self._capture_callback)
+        captured = self._first_frame.wait(1.)
         self._device.close()
         self._device.clean_callbacks()
-        return True
+        if not captured:
+            logging.error('No frame received from capture device')
+            return False
+        # encode on the calling thread, so the file exists once this returns
+        iso_time, frame = self._captured_frame
+        return cv2.imwrite(self._target_path(iso_time), frame,
+                           self._write_params)
 
-    def start_recording(self, path="picture-{}.png"):
-        self._target = path
+    def start_recording(self, path=None):
+        """
+        Starts writing every captured frame to disk
+
+        :param path: Target file pattern, '{}' is replaced with the time of
+                     capture (default: picture-{}.jpg for MJPG streams,
+                     picture-{}.png otherwise)
+        :type path: str
+        """
+        if path is None:
+            path = 'picture-{}' + self._extension
+        self._set_target(path)
         if not self._device._open:
             self._device.open()
         if not self._image_writer._open:
@@ -181,6 +235,29 @@ class ImageRecorder:
     def wait_for_writer(self):
         self._image_writer.close()
 
+    def _set_target(self, path):
+        """
+        Sets the target path. The path is split at '{}' once, so the frame
+        callback can insert the capture time without parsing a format string
+        for every frame.
+
+        :param path: Target file, '{}' is replaced with the time of capture
+        :type path: str
+        """
+        self._target_parts = path.partition('{}')
+
+    def _target_path(self, iso_time):
+        """
+        Returns the target path for a frame captured at iso_time
+
+        :param iso_time: Time of capture
+        :type iso_time: str
+        :return: Target file
+        :rtype: str
+        """
+        prefix, placeholder, suffix = self._target_parts
+        return prefix + iso_time + suffix if placeholder else prefix
+
     def custom_callback(self, iso_time, frame):
         # Option to create a custom function, that modifies the frame before
         # saving
@@ -193,11 +270,25 @@ class ImageRecorder:
         :param rval: rval
         :param frame: frame
         """
-        if rval:
-            iso_time = datetime.datetime.today().isoformat()
+        if not rval:
+            return
+        iso_time = _isoformat(time.time())
 
-            frame = self.custom_callback(
-                iso_time, frame)
+        frame = self.custom_callback(
+            iso_time, frame)
 
-            self._image_writer.write_image(self._target.format(
-                iso_time), frame)
+        self._image_writer.write_image(self._target_path(iso_time), frame)
+
+    def _capture_callback(self, rval, frame):
+        """
+        Internal callback that keeps the first frame for save_image_to
+
+        :param rval: rval
+        :param frame: frame
+        """
+        if not rval or self._first_frame.is_set():
+            return
+        iso_time = _isoformat(time.time())
+        self._captured_frame = (iso_time,
+                                self.custom_callback(iso_time, frame))
+        self._first_frame.set()
@@ -1,7 +1,6 @@
+import collections
 import logging
-import Queue
 import threading
-import time
 
 import cv2
 
@@ -9,11 +8,24 @@ import cv2
 class ImageWriter:
     """Multithreaded image writer for high resolution image processing"""
 
-    def __init__(self, workers=2, write_enabled=True):
+    def __init__(self, workers=2, write_enabled=True, jpeg_quality=90,
+                 queue_size=None):
         self._logger = logging.getLogger(__name__)
         self._logger.debug("Initializing {}".format(__name__))
-        self._queue = Queue.Queue()
+        if queue_size is not None and queue_size < 1:
+            raise ValueError("queue_size must be at least 1 (or None for an " +
+                             "unbounded queue)")
+        # unbounded by default, so images can be held in memory while writing
+        # is disabled; with a queue_size the oldest image is dropped once the
+        # queue is full, so a slow disk never blocks the capture thread
+        self._queue = collections.deque(maxlen=queue_size)
+        self._condition = threading.Condition()
+        # number of queued images plus images currently being written
+        self._pending = 0
+        self._dropped = 0
         self._write_enabled = write_enabled
+        # only applied to .jpg targets, ignored by other formats
+        self._write_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
         self._open = False
         self._worker_threads = [None] * workers
         self.open()
@@ -41,27 +53,36 @@ class ImageWriter:
             self._logger.warning(
                 ("Image inserted while writer is closed - image will only " +
                  "be processed if the writer is reopened"))
-        self._queue.put((path, image))
+        with self._condition:
+            if len(self._queue) == self._queue.maxlen:
+                self._queue.popleft()
+                self._pending -= 1
+                if not self._dropped:
+                    self._logger.warning(
+                        "Image queue full - dropping oldest images")
+                self._dropped += 1
+            self._queue.append((path, image))
+            self._pending += 1
+            self._condition.notify()
 
     def _worker_thread(self):
-        while self._open:
-            if self._write_enabled:
-                try:
-                    cv2.imwrite(*self._queue.get(timeout=1.))
-                    self._queue.task_done()
-                except Queue.Empty:
-                    self._logger.debug("Image writing Queue empty")
-                    continue
-
-                # fn,dummy=self._queue.get()
-                # import os
-                # open(fn, 'a').close()
-
-            else:
-                time.sleep(0.1)
+        while True:
+            with self._condition:
+                while self._open and not (self._write_enabled and self._queue):
+                    self._condition.wait()
+                if not self._open:
+                    return
+                path, image = self._queue.popleft()
+            cv2.imwrite(path, image, self._write_params)
+            with self._condition:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._condition.notify_all()
 
     def enable_write(self, state=True):
-        self._write_enabled = state
+        with self._condition:
+            self._write_enabled = state
+            self._condition.notify_all()
 
     def close(self):
         """
@@ -69,8 +90,16 @@ class ImageWriter:
         """
         self._logger.info("Waiting for image writing tasks to finish")
         self.enable_write()
-        self._queue.join()
-        self._open = False
+        with self._condition:
+            while self._pending:
+                self._condition.wait()
+            self._open = False
+            self._condition.notify_all()
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            self._logger.warning(
+                "{} images were dropped because the queue was full".format(
+                    dropped))
         self._logger.debug("Waiting for workers to return")
         for worker in self._worker_threads:
             worker.join()
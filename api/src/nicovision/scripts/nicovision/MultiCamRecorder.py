@@ -47,7 +47,7 @@ class MultiCamRecorder(object):
                  zoom=None, pan=None, tilt=None, settings_file=None,
                  setting="standard", writer_threads=4,
                  pixel_format="MJPG", calibration_file=None,
-                 undistortion_mode="mono"):
+                 undistortion_mode="mono", queue_size=None):
         """
         Initialises the MultiCamRecorder with given devices.
 
@@ -75,6 +75,10 @@ class MultiCamRecorder(object):
         :type setting: str
         :param writer_threads: Number of worker threads for image writer
         :type writer_threads: int
+        :param queue_size: Maximum number of images waiting to be written - the
+                           oldest image is dropped once the queue is full
+                           (unbounded if None)
+        :type queue_size: int
         :param pixel_format: fourcc codec
         :type pixel_format: string
         :param calibration_file: the calibration_file file
@@ -98,7 +102,8 @@ class MultiCamRecorder(object):
         self._target = 'picture-{}.png'
         self._image_writer = None
         if writer_threads > 0:
-            self._image_writer = ImageWriter(writer_threads)
+            self._image_writer = ImageWriter(writer_threads,
+                                             queue_size=queue_size)
         self._callback_functions = []
         self._framerate = framerate
         self._width = width
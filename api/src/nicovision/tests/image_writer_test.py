@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+
+from nicovision.ImageWriter import ImageWriter
+
+
+class ImageWriterTest(unittest.TestCase):
+    def setUp(self):
+        # record written paths instead of writing to disk
+        self.written = []
+        patcher = mock.patch(
+            "cv2.imwrite", side_effect=lambda path, *args: self.written.append(path)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_close_writes_queued_images(self):
+        """Checks that close writes all images held while writing is disabled"""
+        writer = ImageWriter(2, write_enabled=False)
+        paths = [str(i) for i in range(100)]
+        for path in paths:
+            writer.write_image(path, None)
+        self.assertEqual(self.written, [])
+        writer.close()
+        self.assertEqual(sorted(self.written, key=int), paths)
+
+    def test_drop_oldest(self):
+        """Checks that a bounded queue keeps only the newest images"""
+        writer = ImageWriter(1, write_enabled=False, queue_size=3)
+        for i in range(5):
+            writer.write_image(str(i), None)
+        writer.close()
+        self.assertEqual(self.written, ["2", "3", "4"])
+
+    def test_invalid_queue_size(self):
+        """Checks that queues without room for a single image are rejected"""
+        with self.assertRaises(ValueError):
+            ImageWriter(1, queue_size=0)
+
+
+if __name__ == "__main__":
+    unittest.main()